@@ -2,6 +2,8 @@ import os
 import logging
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.orm import DeclarativeBase
 
 # Configure logging
@@ -40,6 +42,12 @@ app.config['PROCESSED_FOLDER'] = 'processed'
 app.config['MAX_CONTENT_LENGTH'] = 200 * 1024 * 1024  # 200MB max upload size
 app.config['ALLOWED_EXTENSIONS'] = {'mp4', 'avi', 'mov', 'wmv', 'flv', 'webm', 'mkv'}
 
+# Configure batch submission
+app.config['BATCH_SOURCE_FOLDER'] = os.environ.get("BATCH_SOURCE_FOLDER", "catalog")  # Server-side paths must live here
+app.config['MAX_BATCH_SIZE'] = 1000
+app.config['BATCH_WORKERS'] = int(os.environ.get("BATCH_WORKERS", "2"))  # Interactive uploads do not count against this
+app.config['BATCH_LEASE_SECONDS'] = 300  # Batch jobs whose worker stops renewing its claim this long are requeued
+
 # Configure error logging
 if not app.debug:
     import logging
@@ -65,10 +73,47 @@ for folder in [app.config['UPLOAD_FOLDER'], app.config['PROCESSED_FOLDER']]:
     if not os.path.exists(folder):
         os.makedirs(folder)
 
+def add_missing_columns():
+    """Add model columns and indexes missing from existing tables, since db.create_all never alters tables"""
+    dialect = db.engine.dialect
+    preparer = dialect.identifier_preparer
+    
+    for table in db.metadata.sorted_tables:
+        if not inspect(db.engine).has_table(table.name):
+            continue
+        
+        existing = {column['name'] for column in inspect(db.engine).get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            
+            # CreateColumn renders the type and server default; foreign keys are table-level, so add them here
+            column_sql = str(CreateColumn(column).compile(dialect=dialect))
+            for foreign_key in column.foreign_keys:
+                column_sql += (f" REFERENCES {preparer.quote(foreign_key.column.table.name)}"
+                               f" ({preparer.quote(foreign_key.column.name)})")
+            
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(text(f"ALTER TABLE {preparer.quote(table.name)} ADD COLUMN {column_sql}"))
+                app.logger.info(f"Added column {table.name}.{column.name}")
+            except Exception:
+                # Another process starting at the same time may have added it first
+                if column.name not in {c['name'] for c in inspect(db.engine).get_columns(table.name)}:
+                    raise
+        
+        for index in table.indexes:
+            try:
+                index.create(db.engine, checkfirst=True)
+            except Exception:
+                if index.name not in {i['name'] for i in inspect(db.engine).get_indexes(table.name)}:
+                    raise
+
 # Create database tables within app context
 with app.app_context():
     # Import models here to avoid circular imports
     import models  # noqa: F401
     
-    # Create tables
-    db.create_all()
\ No newline at end of file
+    # Create tables and bring existing ones up to date
+    db.create_all()
+    add_missing_columns()
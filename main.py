@@ -1,5 +1,12 @@
+import os
+
 from app import app  # noqa: F401
 import routes  # noqa: F401
 
+# Start batch workers when served by a WSGI server, or in the reloader's child process
+# under app.run; the reloader's parent only watches files and must not claim jobs
+if __name__ != "__main__" or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+    routes.batch_scheduler.start()
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,299 @@
+import os
+import logging
+import subprocess
+import numpy as np
+
+# K-weighting needs a fast IIR filter; fall back to unweighted loudness without SciPy
+try:
+    from scipy.signal import lfilter
+except ImportError:
+    lfilter = None
+
+_warned_unweighted = False
+
+# PCM format shared by every stage of the mixer
+SAMPLE_RATE = 44100
+CHANNELS = 2
+PCM_DTYPE = np.dtype('<i2')
+PCM_INPUT_ARGS = ['-f', 's16le', '-ar', str(SAMPLE_RATE), '-ac', str(CHANNELS)]
+
+# Envelope frames are 10ms, loudness sub-blocks 100ms and processing blocks 60s,
+# so every processing block holds a whole number of frames and sub-blocks
+FRAME_SIZE = SAMPLE_RATE // 100
+SUBBLOCK_SIZE = SAMPLE_RATE // 10
+BLOCK_SIZE = SAMPLE_RATE * 60
+
+# Ducking and loudness defaults
+SPEECH_THRESHOLD_DB = -45.0
+DUCK_DB = -14.0
+LOOKAHEAD_SECONDS = 0.1
+HOLD_SECONDS = 0.25
+RAMP_SECONDS = 0.2
+TARGET_LUFS = -16.0
+PEAK_DB = -1.0  # Sample peak ceiling, not an oversampled true peak
+
+# BS.1770 K-weighting stages as (gain_db, q, centre_hz) and (q, centre_hz), in the
+# parameterisation of Brecht De Man's derivation, which reproduces the ITU
+# coefficients at 48 kHz and generalises them to other sample rates
+_SHELF = (3.99984385397, 0.7071752369554193, 1681.9744509555319)
+_HIGHPASS = (0.5003270373253953, 38.13547087613982)
+
+
+def decode_to_pcm(input_path, pcm_path):
+    """
+    Decode the audio of a media file to raw PCM in the mixer format
+
+    Args:
+        input_path: Path to the video or audio file
+        pcm_path: Path to write the raw PCM samples to
+
+    Returns:
+        True if audio was decoded, False if the input has no usable audio
+    """
+    ffmpeg_cmd = [
+        'ffmpeg', '-y', '-i', input_path,
+        '-vn', '-acodec', 'pcm_s16le'
+    ] + PCM_INPUT_ARGS + [pcm_path]
+    process = subprocess.run(ffmpeg_cmd, capture_output=True, check=False)
+    return process.returncode == 0 and os.path.getsize(pcm_path) > 0
+
+
+def open_pcm(pcm_path):
+    """Memory-map a raw PCM file as a read-only (samples, channels) array"""
+    num_samples = os.path.getsize(pcm_path) // (PCM_DTYPE.itemsize * CHANNELS)
+    if num_samples == 0:
+        return np.zeros((0, CHANNELS), dtype=PCM_DTYPE)
+    return np.memmap(pcm_path, dtype=PCM_DTYPE, mode='r', shape=(num_samples, CHANNELS))
+
+
+def _read_block(pcm, start, stop):
+    """Read samples [start, stop) as float32, zero-padding past the end of the track"""
+    block = np.zeros((stop - start, CHANNELS), dtype=np.float32)
+    available = max(0, min(stop, len(pcm)) - start)
+    if available:
+        block[:available] = pcm[start:start + available]
+        block[:available] *= 1.0 / 32768.0
+    return block
+
+
+def _iter_blocks(num_samples):
+    """Yield (start, stop) sample ranges covering a track in processing blocks"""
+    for start in range(0, num_samples, BLOCK_SIZE):
+        yield start, min(start + BLOCK_SIZE, num_samples)
+
+
+def _window_sum(values, before, after):
+    """Sum values over the window [i - before, i + after] for every index i"""
+    cumulative = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    index = np.arange(len(values))
+    upper = np.minimum(index + after + 1, len(values))
+    lower = np.maximum(index - before, 0)
+    return cumulative[upper] - cumulative[lower], upper - lower
+
+
+def speech_envelope(dubbed, num_samples):
+    """
+    Compute the per-frame level of the dubbed speech track
+
+    Args:
+        dubbed: PCM array of the dubbed speech
+        num_samples: Length of the mix in samples
+
+    Returns:
+        Array of frame levels in dB, one per FRAME_SIZE samples of the mix
+    """
+    num_frames = -(-num_samples // FRAME_SIZE)
+    envelope = np.full(num_frames, -np.inf, dtype=np.float32)
+
+    for start, stop in _iter_blocks(min(num_samples, len(dubbed))):
+        first_frame = start // FRAME_SIZE
+        frame_count = -(-(stop - start) // FRAME_SIZE)
+        block = _read_block(dubbed, start, start + frame_count * FRAME_SIZE)
+        power = np.square(block).reshape(frame_count, -1).mean(axis=1)
+        envelope[first_frame:first_frame + frame_count] = 10.0 * np.log10(power + 1e-10)
+
+    return envelope
+
+
+def ducking_gain(envelope, threshold_db=SPEECH_THRESHOLD_DB, duck_db=DUCK_DB,
+                 lookahead=LOOKAHEAD_SECONDS, hold=HOLD_SECONDS, ramp=RAMP_SECONDS):
+    """
+    Turn a speech envelope into a per-frame gain for the original track
+
+    Speech regions are widened by the lookahead before and the hold after each
+    active frame, then smoothed so the duck fades in and out over the ramp.
+
+    Args:
+        envelope: Frame levels in dB from speech_envelope
+        threshold_db: Level above which a frame counts as speech
+        duck_db: Attenuation applied to the original track under speech
+        lookahead: Seconds to start ducking before speech begins
+        hold: Seconds to keep ducking after speech ends
+        ramp: Seconds taken to fade between full level and ducked level
+
+    Returns:
+        Array of linear gains, one per frame
+    """
+    frames_per_second = SAMPLE_RATE / FRAME_SIZE
+    active = (envelope > threshold_db).astype(np.float32)
+
+    widened, _ = _window_sum(
+        active,
+        int(round(hold * frames_per_second)),
+        int(round(lookahead * frames_per_second))
+    )
+    gate = (widened > 0).astype(np.float32)
+
+    half_ramp = int(round(ramp * frames_per_second / 2))
+    total, count = _window_sum(gate, half_ramp, half_ramp)
+    smoothed = total / np.maximum(count, 1)
+
+    return np.power(10.0, duck_db * smoothed / 20.0).astype(np.float32)
+
+
+def _mixed_blocks(original, dubbed, gain, num_samples):
+    """Yield blocks of the ducked original summed with the dubbed speech"""
+    frame_centres = (np.arange(len(gain)) + 0.5) * FRAME_SIZE
+
+    for start, stop in _iter_blocks(num_samples):
+        # Only interpolate over the frames that touch this block
+        first = max(start // FRAME_SIZE - 1, 0)
+        last = min(stop // FRAME_SIZE + 2, len(gain))
+        sample_gain = np.interp(
+            np.arange(start, stop),
+            frame_centres[first:last],
+            gain[first:last]
+        ).astype(np.float32)
+
+        block = _read_block(original, start, stop)
+        block *= sample_gain[:, None]
+        block += _read_block(dubbed, start, stop)
+        yield block
+
+
+def _shelf_coefficients(gain_db, q, centre_hz, sample_rate=SAMPLE_RATE):
+    """Return (b, a) coefficients of the K-weighting high shelf (De Man's BS.1770 form)"""
+    k = np.tan(np.pi * centre_hz / sample_rate)
+    vh = 10.0 ** (gain_db / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+
+    b = [(vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0]
+    a = [1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+    return np.array(b), np.array(a)
+
+
+def _highpass_coefficients(q, centre_hz, sample_rate=SAMPLE_RATE):
+    """Return (b, a) coefficients of the K-weighting high-pass (De Man's BS.1770 form)"""
+    k = np.tan(np.pi * centre_hz / sample_rate)
+    a0 = 1.0 + k / q + k * k
+
+    a = [1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+    return np.array([1.0, -2.0, 1.0]), np.array(a)
+
+
+def measure_loudness(blocks):
+    """
+    Measure integrated loudness and sample peak of a stream of audio blocks
+
+    Loudness follows ITU-R BS.1770 gating over 400ms windows with 75% overlap.
+    Without SciPy the K-weighting filter is skipped and the result is an
+    unweighted approximation.
+
+    Args:
+        blocks: Iterable of float32 (samples, channels) arrays
+
+    Returns:
+        Tuple of (loudness in LUFS or None if the audio is silent, linear peak)
+    """
+    global _warned_unweighted
+    if lfilter is None and not _warned_unweighted:
+        logging.warning("SciPy is not installed; loudness is measured without K-weighting "
+                        "and normalization may miss the LUFS target by several LU")
+        _warned_unweighted = True
+
+    stages = [_shelf_coefficients(*_SHELF), _highpass_coefficients(*_HIGHPASS)]
+    states = [np.zeros((2, CHANNELS)) for _ in stages]
+    subblock_power = []
+    peak = 0.0
+
+    for block in blocks:
+        if len(block):
+            peak = max(peak, float(np.abs(block).max()))
+
+        weighted = block
+        if lfilter is not None:
+            for i, (b, a) in enumerate(stages):
+                weighted, states[i] = lfilter(b, a, weighted, axis=0, zi=states[i])
+
+        # Processing blocks are whole multiples of a sub-block except the last,
+        # whose incomplete tail is ignored as BS.1770 does
+        count = len(weighted) // SUBBLOCK_SIZE
+        if count:
+            squared = np.square(weighted[:count * SUBBLOCK_SIZE])
+            subblock_power.append(squared.reshape(count, SUBBLOCK_SIZE, CHANNELS).mean(axis=1).sum(axis=1))
+
+    if not subblock_power:
+        return None, peak
+
+    power = np.concatenate(subblock_power)
+    if len(power) < 4:
+        return None, peak
+
+    window_power = (power[:-3] + power[1:-2] + power[2:-1] + power[3:]) / 4.0
+    window_loudness = -0.691 + 10.0 * np.log10(window_power + 1e-20)
+
+    gated = window_power[window_loudness > -70.0]
+    if not len(gated):
+        return None, peak
+
+    relative_gate = -0.691 + 10.0 * np.log10(gated.mean()) - 10.0
+    gated = window_power[(window_loudness > -70.0) & (window_loudness > relative_gate)]
+    return -0.691 + 10.0 * np.log10(gated.mean()), peak
+
+
+def mix_dubbed_audio(original_pcm_path, dubbed_pcm_path, output, target_lufs=TARGET_LUFS):
+    """
+    Duck the original audio under the dubbed speech and write a normalized mix
+
+    Both tracks are memory-mapped and processed in fixed-size blocks, so memory
+    use does not grow with track length. The mix is written as raw PCM in the
+    mixer format, ready to be fed to ffmpeg with PCM_INPUT_ARGS.
+
+    Args:
+        original_pcm_path: Raw PCM of the original audio, or None if there is none
+        dubbed_pcm_path: Raw PCM of the dubbed speech
+        output: Binary file-like object to write the mixed PCM to
+        target_lufs: Integrated loudness to normalize the mix to
+
+    Returns:
+        Gain in dB applied for loudness normalization
+
+    Raises:
+        ValueError: If neither track contains any samples
+    """
+    dubbed = open_pcm(dubbed_pcm_path)
+    if original_pcm_path:
+        original = open_pcm(original_pcm_path)
+    else:
+        original = np.zeros((0, CHANNELS), dtype=PCM_DTYPE)
+    num_samples = max(len(original), len(dubbed))
+    if num_samples == 0:
+        raise ValueError("No audio to mix: the dubbed track is empty and the video has no audio")
+
+    gain = ducking_gain(speech_envelope(dubbed, num_samples))
+
+    # First pass measures the mix, second pass writes it at the corrected level
+    loudness, peak = measure_loudness(_mixed_blocks(original, dubbed, gain, num_samples))
+    gain_db = 0.0 if loudness is None else target_lufs - loudness
+    if peak > 0:
+        # Keep the sample peak below the ceiling after normalization
+        gain_db = min(gain_db, PEAK_DB - 20.0 * np.log10(peak))
+    scale = np.float32(10.0 ** (gain_db / 20.0))
+
+    for block in _mixed_blocks(original, dubbed, gain, num_samples):
+        block *= scale * 32767.0
+        np.clip(block, -32768, 32767, out=block)
+        output.write(block.astype(PCM_DTYPE).tobytes())
+
+    return gain_db
@@ -25,6 +25,14 @@ class VideoJob(db.Model):
     output_path = db.Column(db.String(255), nullable=True)
     transcript = db.Column(db.Text, nullable=True)
     translation = db.Column(db.Text, nullable=True)
+    text_updated_at = db.Column(db.DateTime, nullable=True)  # Last change to transcript or translation
+    content_hash = db.Column(db.String(64), nullable=True, index=True)  # SHA-256 of the source video
+    
+    # Batch submission details
+    batch_id = db.Column(db.String(36), db.ForeignKey('batch_job.id'), nullable=True, index=True)
+    batch_position = db.Column(db.Integer, nullable=True)  # Index of the item in its batch manifest
+    claimed_at = db.Column(db.DateTime, nullable=True)  # Last heartbeat of the worker running a batch job
+    priority = db.Column(db.Integer, default=0, server_default='0')
     
     def to_dict(self):
         """Convert job to dictionary"""
@@ -38,9 +46,49 @@ class VideoJob(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'target_language': self.target_language,
             'has_output': bool(self.output_path),
+            'batch_id': self.batch_id,
+            'priority': self.priority,
             'transcript': self.transcript,
             'translation': self.translation
         }
+    
+    def to_status_dict(self, fields=None):
+        """Convert job to a compact status dictionary without transcript or translation text"""
+        status = {
+            'id': self.id,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
+            'target_language': self.target_language,
+            'has_output': bool(self.output_path),
+            'batch_id': self.batch_id
+        }
+        if fields is not None:
+            status = {key: value for key, value in status.items() if key in fields}
+        return status
+
+
+class BatchJob(db.Model):
+    """Model for a batch of video jobs submitted together"""
+    id = db.Column(db.String(36), primary_key=True, default=generate_job_id)
+    name = db.Column(db.String(255), nullable=True)
+    priority = db.Column(db.Integer, default=0)
+    total_jobs = db.Column(db.Integer, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Define relationship with VideoJob
+    jobs = db.relationship('VideoJob', backref='batch', lazy='dynamic')
+    
+    def to_dict(self):
+        """Convert batch to dictionary"""
+        return {
+            'id': self.id,
+            'name': self.name,
+            'priority': self.priority,
+            'total_jobs': self.total_jobs,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
 
 
 class ProcessingStage(db.Model):
@@ -68,4 +116,14 @@ class ProcessingStage(db.Model):
             'message': self.message,
             'started_at': self.started_at.isoformat() if self.started_at else None,
             'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+    
+    def to_status_dict(self):
+        """Convert stage to a compact status dictionary for embedding in its job's status"""
+        return {
+            'stage_name': self.stage_name,
+            'status': self.status,
+            'progress': self.progress,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
         }
\ No newline at end of file
@@ -1,15 +1,47 @@
 import os
+import hashlib
 import time
 import threading
 import uuid
-from datetime import datetime
-from functools import wraps
+from datetime import datetime, timedelta
+from functools import lru_cache, wraps
 from flask import render_template, request, jsonify, url_for, send_from_directory, abort
+from sqlalchemy import func, insert
+from sqlalchemy.orm import defer
 from werkzeug.utils import secure_filename
 
 from app import app, db
-from models import VideoJob, ProcessingStage
-from utils import transcribe_video, translate_text, generate_speech, merge_audio_video, clean_temp_files
+from models import VideoJob, ProcessingStage, BatchJob, generate_job_id
+from scheduler import JobScheduler
+from utils import transcribe_video, translate_text, generate_speech, merge_audio_video, clean_temp_files, link_or_copy, save_with_sha256, split_into_segments
+
+SUPPORTED_LANGUAGES = {
+    'en': 'English',
+    'es': 'Spanish',
+    'fr': 'French',
+    'de': 'German',
+    'it': 'Italian',
+    'pt': 'Portuguese',
+    'ru': 'Russian',
+    'ja': 'Japanese',
+    'ko': 'Korean',
+    'zh-CN': 'Chinese (Simplified)'
+}
+
+# Stages every job goes through, in order
+PROCESSING_STAGES = [
+    ('extracting', 'Extracting audio from video'),
+    ('transcribing', 'Transcribing audio to text'),
+    ('translating', 'Translating text'),
+    ('generating', 'Generating speech from translation'),
+    ('merging', 'Merging audio with video')
+]
+
+# Version of the compact status representation, part of every status ETag
+STATUS_VERSION = '2'
+STATUS_FIELDS = {'id', 'status', 'progress', 'message', 'updated_at', 'target_language', 'has_output', 'batch_id', 'stages'}
+SEGMENTS_PER_PAGE = 50
+MAX_SEGMENTS_PER_PAGE = 500
 
 # Cache control decorator
 def nocache(view):
@@ -22,6 +54,29 @@ def nocache(view):
         return response
     return no_cache
 
+# Conditional response helpers
+def status_etag(job_id, updated_at, *parts):
+    """Build a weak ETag for a representation of a job as of the given update time"""
+    version = updated_at.isoformat() if updated_at else ''
+    key = '|'.join([STATUS_VERSION, job_id, version] + list(parts))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+def not_modified(etag):
+    """Return a 304 response if the client already holds this ETag, otherwise None"""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def conditional_json(etag, payload):
+    """Return a JSON response that clients revalidate with If-None-Match"""
+    response = jsonify(payload)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
 # Helper function to check allowed file extensions
 def allowed_file(filename):
     return '.' in filename and \
@@ -31,19 +86,7 @@ def allowed_file(filename):
 @app.route('/')
 def index():
     """Render the main application page"""
-    languages = {
-        'en': 'English',
-        'es': 'Spanish',
-        'fr': 'French',
-        'de': 'German',
-        'it': 'Italian',
-        'pt': 'Portuguese',
-        'ru': 'Russian',
-        'ja': 'Japanese',
-        'ko': 'Korean',
-        'zh-CN': 'Chinese (Simplified)'
-    }
-    return render_template('index.html', languages=languages)
+    return render_template('index.html', languages=SUPPORTED_LANGUAGES)
 
 @app.route('/api/upload', methods=['POST'])
 def upload_video():
@@ -64,6 +107,7 @@ def upload_video():
         try:
             # Create a new job
             job = VideoJob(
+                id=generate_job_id(),
                 original_filename=secure_filename(file.filename),
                 target_language=target_lang,
                 status='pending'
@@ -72,22 +116,20 @@ def upload_video():
             
             # Create processing stages
             stages = [
-                ProcessingStage(job_id=job.id, stage_name='extracting', message='Extracting audio from video'),
-                ProcessingStage(job_id=job.id, stage_name='transcribing', message='Transcribing audio to text'),
-                ProcessingStage(job_id=job.id, stage_name='translating', message='Translating text'),
-                ProcessingStage(job_id=job.id, stage_name='generating', message='Generating speech from translation'),
-                ProcessingStage(job_id=job.id, stage_name='merging', message='Merging audio with video')
+                ProcessingStage(job_id=job.id, stage_name=stage_name, message=stage_message)
+                for stage_name, stage_message in PROCESSING_STAGES
             ]
             db.session.add_all(stages)
             db.session.commit()
             
-            # Save the uploaded file
+            # Save the uploaded file, hashing it as it is written
             video_filename = f"{job.id}_{secure_filename(file.filename)}"
             video_path = os.path.join(app.config['UPLOAD_FOLDER'], video_filename)
-            file.save(video_path)
+            content_hash = save_with_sha256(file.stream, video_path)
             
             # Update job with video path
             job.video_path = video_path
+            job.content_hash = content_hash
             job.status = 'processing'
             job.progress = 0
             job.message = 'Processing started'
@@ -122,6 +164,259 @@ def job_status(job_id):
         'stages': [stage.to_dict() for stage in stages]
     })
 
+def is_integer(value):
+    """Check for a JSON integer, which excludes booleans"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def is_supported_language(value):
+    """Check for a supported target language code"""
+    return isinstance(value, str) and value in SUPPORTED_LANGUAGES
+
+def resolve_batch_source(path):
+    """Resolve a manifest path inside the batch source folder, or return None"""
+    if '\x00' in path:
+        return None
+    source_folder = os.path.realpath(app.config['BATCH_SOURCE_FOLDER'])
+    resolved = os.path.realpath(os.path.join(source_folder, path))
+    if os.path.commonpath([source_folder, resolved]) != source_folder:
+        return None
+    if not allowed_file(resolved) or not os.path.isfile(resolved):
+        return None
+    return resolved
+
+@app.route('/api/batch', methods=['POST'])
+def create_batch():
+    """Create jobs for every item of a batch manifest in a single transaction"""
+    manifest = request.get_json(silent=True)
+    if not isinstance(manifest, dict) or not isinstance(manifest.get('items'), list):
+        return jsonify({'error': 'Manifest must be a JSON object with an items list'}), 400
+    
+    items = manifest['items']
+    if not items:
+        return jsonify({'error': 'Manifest has no items'}), 400
+    if len(items) > app.config['MAX_BATCH_SIZE']:
+        return jsonify({'error': f"Batches are limited to {app.config['MAX_BATCH_SIZE']} items"}), 400
+    
+    name = manifest.get('name')
+    if name is not None and (not isinstance(name, str) or len(name) > 255):
+        return jsonify({'error': 'Manifest name must be a string of at most 255 characters'}), 400
+    
+    default_lang = manifest.get('language', 'en')
+    if not is_supported_language(default_lang):
+        return jsonify({'error': f'Manifest has unsupported language {default_lang!r}'}), 400
+    
+    default_priority = manifest.get('priority', 0)
+    if not is_integer(default_priority):
+        return jsonify({'error': 'Manifest priority must be an integer'}), 400
+    
+    # Validate every item before touching the database
+    entries = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            return jsonify({'error': f'Item {index} must be an object'}), 400
+        
+        target_lang = item.get('language', default_lang)
+        if not is_supported_language(target_lang):
+            return jsonify({'error': f'Item {index} has unsupported language {target_lang!r}'}), 400
+        
+        priority = item.get('priority', default_priority)
+        if not is_integer(priority):
+            return jsonify({'error': f'Item {index} priority must be an integer'}), 400
+        
+        path = item.get('path')
+        content_hash = item.get('content_hash')
+        if path is not None and not isinstance(path, str):
+            return jsonify({'error': f'Item {index} path must be a string'}), 400
+        if content_hash is not None and not isinstance(content_hash, str):
+            return jsonify({'error': f'Item {index} content_hash must be a string'}), 400
+        if not path and not content_hash:
+            return jsonify({'error': f'Item {index} needs a path or content_hash'}), 400
+        
+        entries.append((target_lang, priority, path, content_hash))
+    
+    # Resolve all content hashes with one query
+    hashes = {content_hash for _, _, path, content_hash in entries if not path and content_hash}
+    hash_paths = {}
+    if hashes:
+        rows = db.session.query(VideoJob.content_hash, VideoJob.video_path, VideoJob.original_filename) \
+            .filter(VideoJob.content_hash.in_(hashes), VideoJob.video_path.isnot(None),
+                    VideoJob.status != 'cancelled').all()
+        for content_hash, video_path, original_filename in rows:
+            if os.path.isfile(video_path):
+                hash_paths[content_hash] = (video_path, original_filename)
+    
+    batch_id = generate_job_id()
+    now = datetime.utcnow()
+    job_rows = []
+    stage_rows = []
+    links = []
+    
+    for index, (target_lang, priority, path, content_hash) in enumerate(entries):
+        job_id = generate_job_id()
+        if path:
+            video_path = resolve_batch_source(path)
+            original_filename = secure_filename(os.path.basename(video_path or ''))
+        else:
+            video_path, original_filename = hash_paths.get(content_hash, (None, None))
+        
+        if not video_path:
+            return jsonify({'error': f'Item {index} does not refer to an available video'}), 400
+        
+        if not path:
+            # Uploads belong to the job that uploaded them and are deleted with it,
+            # so give this job its own link to the content
+            source_path = video_path
+            video_path = os.path.join(app.config['UPLOAD_FOLDER'], f"{job_id}_{original_filename}")
+            links.append((source_path, video_path))
+        
+        job_rows.append({
+            'id': job_id,
+            'original_filename': original_filename,
+            'status': 'pending',
+            'progress': 0,
+            'message': 'Queued for processing',
+            'created_at': now,
+            'updated_at': now,
+            'target_language': target_lang,
+            'video_path': video_path,
+            'content_hash': content_hash,
+            'batch_id': batch_id,
+            'batch_position': index,
+            'priority': priority
+        })
+        stage_rows.extend(
+            {'job_id': job_id, 'stage_name': stage_name, 'status': 'pending', 'progress': 0, 'message': stage_message}
+            for stage_name, stage_message in PROCESSING_STAGES
+        )
+    
+    try:
+        for source_path, link_path in links:
+            link_or_copy(source_path, link_path)
+        
+        batch = BatchJob(
+            id=batch_id,
+            name=name,
+            priority=default_priority,
+            total_jobs=len(job_rows),
+            created_at=now
+        )
+        db.session.add(batch)
+        db.session.flush()
+        db.session.execute(insert(VideoJob), job_rows)
+        db.session.execute(insert(ProcessingStage), stage_rows)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        for _, link_path in links:
+            if os.path.exists(link_path):
+                os.unlink(link_path)
+        app.logger.error(f"Error creating batch: {str(e)}")
+        return jsonify({'error': 'Failed to create batch'}), 500
+    
+    batch_scheduler.notify()
+    
+    return jsonify({
+        'batch_id': batch_id,
+        'job_ids': [row['id'] for row in job_rows],
+        'total_jobs': len(job_rows)
+    }), 202
+
+@app.route('/api/batch/<batch_id>', methods=['GET'])
+def batch_status(batch_id):
+    """Get aggregate progress of a batch"""
+    batch = BatchJob.query.get_or_404(batch_id)
+    
+    # Aggregate in the database rather than loading every job
+    rows = db.session.query(VideoJob.status, func.count(VideoJob.id), func.sum(VideoJob.progress)) \
+        .filter(VideoJob.batch_id == batch_id) \
+        .group_by(VideoJob.status).all()
+    
+    # Finished jobs count as fully done; failed ones have their progress reset to 0
+    finished_statuses = ['completed', 'failed', 'cancelled']
+    counts = {status: count for status, count, _ in rows}
+    total_progress = sum(
+        count * 100 if status in finished_statuses else (progress or 0)
+        for status, count, progress in rows
+    )
+    total = sum(counts.values())
+    finished = sum(counts.get(status, 0) for status in finished_statuses)
+    
+    return jsonify({
+        'batch': batch.to_dict(),
+        'counts': counts,
+        'progress': round(total_progress / total) if total else 0,
+        'finished': total > 0 and finished == total
+    })
+
+@app.route('/api/v2/status/<job_id>', methods=['GET'])
+def job_status_v2(job_id):
+    """Get a compact, cacheable status of a processing job"""
+    fields = None
+    if request.args.get('fields'):
+        fields = {field.strip() for field in request.args['fields'].split(',') if field.strip()}
+        unknown = fields - STATUS_FIELDS
+        if unknown:
+            return jsonify({'error': f"Unknown fields: {', '.join(sorted(unknown))}"}), 400
+    
+    # Transcript and translation are not part of this representation, so don't load them
+    job = VideoJob.query.options(defer(VideoJob.transcript), defer(VideoJob.translation)).get_or_404(job_id)
+    
+    etag = status_etag(job.id, job.updated_at, ','.join(sorted(fields or STATUS_FIELDS)))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    payload = job.to_status_dict(fields)
+    if fields is None or 'stages' in fields:
+        stages = ProcessingStage.query.filter_by(job_id=job_id).order_by(ProcessingStage.id).all()
+        payload['stages'] = [stage.to_status_dict() for stage in stages]
+    payload['version'] = STATUS_VERSION
+    
+    return conditional_json(etag, payload)
+
+@lru_cache(maxsize=32)
+def load_segments(job_id, kind, text_updated_at):
+    """Load and split a job's transcript or translation, cached per text version"""
+    text = db.session.query(getattr(VideoJob, kind)).filter_by(id=job_id).scalar()
+    return tuple(split_into_segments(text))
+
+@app.route('/api/v2/status/<job_id>/<any(transcript, translation):kind>', methods=['GET'])
+def job_segments(job_id, kind):
+    """Get a page of transcript or translation segments for a job"""
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', SEGMENTS_PER_PAGE))
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    if offset < 0 or limit < 1:
+        return jsonify({'error': 'offset must be >= 0 and limit must be >= 1'}), 400
+    limit = min(limit, MAX_SEGMENTS_PER_PAGE)
+    
+    # Check freshness before loading the text itself; progress updates don't touch text_updated_at
+    row = db.session.query(VideoJob.text_updated_at).filter_by(id=job_id).first()
+    if row is None:
+        abort(404)
+    
+    etag = status_etag(job_id, row.text_updated_at, kind, str(offset), str(limit))
+    cached = not_modified(etag)
+    if cached:
+        return cached
+    
+    segments = load_segments(job_id, kind, row.text_updated_at)
+    
+    return conditional_json(etag, {
+        'job_id': job_id,
+        'kind': kind,
+        'offset': offset,
+        'limit': limit,
+        'total': len(segments),
+        'segments': [
+            {'index': index, 'text': segment}
+            for index, segment in enumerate(segments[offset:offset + limit], start=offset)
+        ],
+        'version': STATUS_VERSION
+    })
+
 @app.route('/download/<job_id>', methods=['GET'])
 @nocache
 def download_video(job_id):
@@ -206,10 +501,59 @@ def update_stage_status(job_id, stage_name, status, progress=0, message=None):
         elif status in ['completed', 'failed']:
             stage.completed_at = datetime.utcnow()
         
+        # Stages are part of the job's status, so invalidate its ETag
+        VideoJob.query.filter_by(id=job_id).update({'updated_at': datetime.utcnow()})
         db.session.commit()
     except Exception as e:
         app.logger.error(f"Error updating stage status: {str(e)}")
 
+def claim_batch_job():
+    """Atomically take the next queued or abandoned batch job, or return None"""
+    with app.app_context():
+        # A processing job whose claim was not renewed within the lease lost its worker
+        stale_before = datetime.utcnow() - timedelta(seconds=app.config['BATCH_LEASE_SECONDS'])
+        claimable = db.or_(
+            VideoJob.status == 'pending',
+            db.and_(
+                VideoJob.status == 'processing',
+                db.or_(VideoJob.claimed_at.is_(None), VideoJob.claimed_at < stale_before)
+            )
+        )
+        
+        while True:
+            # Higher priority first; equal priorities interleave batches by position
+            candidate = db.session.query(VideoJob.id) \
+                .filter(VideoJob.batch_id.isnot(None), claimable) \
+                .order_by(VideoJob.priority.desc(), VideoJob.batch_position, VideoJob.created_at) \
+                .first()
+            if candidate is None:
+                return None
+            
+            # Only one worker (in any process) can win the conditional update
+            now = datetime.utcnow()
+            claimed = VideoJob.query.filter(VideoJob.id == candidate.id, claimable).update({
+                'status': 'processing',
+                'message': 'Processing started',
+                'claimed_at': now,
+                'updated_at': now
+            }, synchronize_session=False)
+            db.session.commit()
+            if claimed:
+                return candidate.id
+
+def renew_batch_claims(job_ids):
+    """Refresh the claims of batch jobs this process is still running"""
+    with app.app_context():
+        VideoJob.query.filter(VideoJob.id.in_(job_ids), VideoJob.status == 'processing') \
+            .update({'claimed_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+
+def run_batch_job(job_id):
+    """Process a batch job claimed by a scheduler worker"""
+    with app.app_context():
+        job = VideoJob.query.get(job_id)
+        process_video(job.id, job.video_path, job.target_language)
+
 def process_video(job_id, video_path, target_lang):
     """Process the uploaded video (run in a separate thread)"""
     try:
@@ -234,6 +578,7 @@ def process_video(job_id, video_path, target_lang):
         # Update job with transcript
         job = VideoJob.query.get(job_id)
         job.transcript = transcript
+        job.text_updated_at = datetime.utcnow()
         db.session.commit()
         
         update_stage_status(job_id, 'transcribing', 'completed', 100)
@@ -248,6 +593,7 @@ def process_video(job_id, video_path, target_lang):
         # Update job with translation
         job = VideoJob.query.get(job_id)
         job.translation = translated_text
+        job.text_updated_at = datetime.utcnow()
         db.session.commit()
         
         update_stage_status(job_id, 'translating', 'completed', 100)
@@ -305,4 +651,14 @@ def process_video(job_id, video_path, target_lang):
             0, 
             f"Processing failed: {str(e)}", 
             status='failed'
-        )
\ No newline at end of file
+        )
+
+# Batch jobs share a bounded worker pool fed from the database; interactive uploads keep their own threads.
+# The entry point starts it, so importing this module does not spawn workers.
+batch_scheduler = JobScheduler(
+    app.config['BATCH_WORKERS'],
+    claim_batch_job,
+    run_batch_job,
+    renew_batch_claims,
+    heartbeat_interval=app.config['BATCH_LEASE_SECONDS'] // 3
+)
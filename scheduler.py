@@ -0,0 +1,85 @@
+import logging
+import threading
+import time
+
+
+class JobScheduler:
+    """
+    Bounded worker pool that runs jobs claimed from a persistent queue
+
+    The queue itself lives in the database: `claim` atomically takes the next
+    queued job and returns its ID, or None when nothing is waiting. Workers
+    sleep until notify() is called or the poll interval passes, so jobs queued
+    before a restart or by another process are still picked up.
+
+    While jobs run, `heartbeat` is called every heartbeat_interval seconds with
+    the IDs of this pool's running jobs so their claims stay fresh; claims that
+    stop being renewed, e.g. because the process died, can be taken over.
+    """
+
+    def __init__(self, max_workers, claim, run, heartbeat, poll_interval=30, heartbeat_interval=60):
+        self.max_workers = max_workers
+        self.claim = claim
+        self.run = run
+        self.heartbeat = heartbeat
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self._condition = threading.Condition()
+        self._woken = False
+        self._workers = []
+        self._running = set()
+
+    def start(self):
+        """Start worker threads up to max_workers, plus the heartbeat thread"""
+        with self._condition:
+            if not self._workers:
+                threading.Thread(target=self._beat, daemon=True).start()
+            while len(self._workers) < self.max_workers:
+                worker = threading.Thread(target=self._run, daemon=True)
+                self._workers.append(worker)
+                worker.start()
+
+    def notify(self):
+        """Wake idle workers because new jobs were queued"""
+        with self._condition:
+            self._woken = True
+            self._condition.notify_all()
+
+    def _run(self):
+        """Worker loop: claim the next queued job and run it"""
+        while True:
+            try:
+                job_id = self.claim()
+            except Exception as e:
+                logging.error(f"Error claiming scheduled job: {str(e)}")
+                job_id = None
+
+            if job_id is None:
+                with self._condition:
+                    if not self._woken:
+                        self._condition.wait(self.poll_interval)
+                    self._woken = False
+                continue
+
+            with self._condition:
+                self._running.add(job_id)
+            try:
+                self.run(job_id)
+            except Exception as e:
+                logging.error(f"Error running scheduled job {job_id}: {str(e)}")
+            finally:
+                with self._condition:
+                    self._running.discard(job_id)
+
+    def _beat(self):
+        """Heartbeat loop: renew the claims of running jobs"""
+        while True:
+            time.sleep(self.heartbeat_interval)
+            with self._condition:
+                running = list(self._running)
+            if not running:
+                continue
+            try:
+                self.heartbeat(running)
+            except Exception as e:
+                logging.error(f"Error renewing scheduled job claims: {str(e)}")
@@ -0,0 +1,55 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session')
+def flask_app():
+    """Import the app against a temporary SQLite database and working directory"""
+    pytest.importorskip('flask')
+    pytest.importorskip('flask_sqlalchemy')
+
+    work_dir = tempfile.mkdtemp(prefix='videodubber-tests-')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(work_dir, 'test.db')
+    os.environ['BATCH_SOURCE_FOLDER'] = os.path.join(work_dir, 'catalog')
+    os.makedirs(os.environ['BATCH_SOURCE_FOLDER'])
+
+    # The app creates its upload, processed and log folders relative to the working directory
+    previous_dir = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        from app import app
+        import routes  # noqa: F401
+        yield app
+    finally:
+        os.chdir(previous_dir)
+
+
+@pytest.fixture
+def client(flask_app):
+    """Test client with freshly created tables"""
+    from app import db
+
+    with flask_app.app_context():
+        db.drop_all()
+        db.create_all()
+
+    yield flask_app.test_client()
+
+    with flask_app.app_context():
+        db.session.remove()
+
+
+@pytest.fixture
+def catalog_file(flask_app):
+    """Create a video file inside the batch source folder and return its manifest path"""
+    def create(name='episode.mp4', content=b'video'):
+        with open(os.path.join(flask_app.config['BATCH_SOURCE_FOLDER'], name), 'wb') as f:
+            f.write(content)
+        return name
+    return create
@@ -0,0 +1,189 @@
+import io
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+
+@pytest.fixture
+def routes(flask_app):
+    import routes
+    return routes
+
+
+def create_batch(client, manifest):
+    response = client.post('/api/batch', json=manifest)
+    assert response.status_code == 202, response.get_json()
+    return response.get_json()
+
+
+def set_job(flask_app, job_id, **values):
+    from app import db
+    from models import VideoJob
+
+    with flask_app.app_context():
+        VideoJob.query.filter_by(id=job_id).update(values)
+        db.session.commit()
+
+
+def claim_all(flask_app, routes):
+    from app import db
+    from models import VideoJob
+
+    claimed = []
+    while True:
+        job_id = routes.claim_batch_job()
+        if job_id is None:
+            return claimed
+        with flask_app.app_context():
+            job = db.session.get(VideoJob, job_id)
+            claimed.append((job.batch_id, job.batch_position))
+
+
+@pytest.mark.parametrize('manifest, error', [
+    ({'items': 'episode.mp4'}, 'items list'),
+    ({'items': [{'path': 5}]}, 'path must be a string'),
+    ({'items': [{'content_hash': ['a']}]}, 'content_hash must be a string'),
+    ({'items': [{'path': 'episode.mp4', 'priority': True}]}, 'priority must be an integer'),
+    ({'priority': False, 'items': [{'path': 'episode.mp4'}]}, 'Manifest priority'),
+    ({'items': [{'path': 'episode.mp4', 'language': 'xx'}]}, 'unsupported language'),
+    ({'language': ['en'], 'items': [{'path': 'episode.mp4'}]}, 'Manifest has unsupported language'),
+    ({'name': {'x': 1}, 'items': [{'path': 'episode.mp4'}]}, 'Manifest name'),
+    ({'items': [{'path': '../outside.mp4'}]}, 'does not refer to an available video'),
+])
+def test_create_batch_rejects_invalid_manifests(client, catalog_file, flask_app, manifest, error):
+    catalog_file('episode.mp4')
+    # A real file just outside the source folder, so traversal would find something
+    with open(os.path.join(flask_app.config['BATCH_SOURCE_FOLDER'], '..', 'outside.mp4'), 'wb') as f:
+        f.write(b'video')
+
+    response = client.post('/api/batch', json=manifest)
+
+    assert response.status_code == 400
+    assert error in response.get_json()['error']
+
+
+def test_create_batch_inserts_all_rows_in_one_commit(client, catalog_file, flask_app):
+    from sqlalchemy import event
+    from app import db
+    from models import VideoJob, ProcessingStage
+
+    catalog_file('episode.mp4')
+    commits = []
+
+    def count_commit(connection):
+        commits.append(connection)
+
+    with flask_app.app_context():
+        engine = db.engine
+    event.listen(engine, 'commit', count_commit)
+    try:
+        result = create_batch(client, {'items': [{'path': 'episode.mp4'}] * 1000})
+    finally:
+        event.remove(engine, 'commit', count_commit)
+
+    assert result['total_jobs'] == 1000
+    assert len(commits) == 1
+    with flask_app.app_context():
+        assert VideoJob.query.filter_by(batch_id=result['batch_id']).count() == 1000
+        assert ProcessingStage.query.count() == 5000
+
+
+def test_claim_orders_by_priority_then_interleaves_batches(client, catalog_file, flask_app, routes):
+    catalog_file('episode.mp4')
+    first = create_batch(client, {'items': [{'path': 'episode.mp4'}] * 2})['batch_id']
+    second = create_batch(client, {'items': [{'path': 'episode.mp4'}] * 2})['batch_id']
+    urgent = create_batch(client, {'priority': 5, 'items': [{'path': 'episode.mp4'}]})['batch_id']
+
+    assert claim_all(flask_app, routes) == [
+        (urgent, 0),
+        (first, 0),
+        (second, 0),
+        (first, 1),
+        (second, 1),
+    ]
+
+
+def test_claim_skips_rows_that_stop_being_pending(client, catalog_file, flask_app, routes):
+    from sqlalchemy import event
+    from app import db
+
+    catalog_file('episode.mp4')
+    job_ids = create_batch(client, {'items': [{'path': 'episode.mp4'}] * 2})['job_ids']
+
+    # Another worker claims the first row between our SELECT and our UPDATE
+    def steal(connection, cursor, statement, parameters, context, executemany):
+        if statement.startswith('UPDATE video_job SET status') and not stolen:
+            stolen.append(True)
+            cursor.execute(
+                "UPDATE video_job SET status = 'processing', claimed_at = ? WHERE id = ?",
+                (datetime.utcnow(), job_ids[0])
+            )
+
+    stolen = []
+    with flask_app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', steal)
+    try:
+        assert routes.claim_batch_job() == job_ids[1]
+    finally:
+        event.remove(engine, 'before_cursor_execute', steal)
+
+    assert stolen
+    assert routes.claim_batch_job() is None
+
+
+def test_claim_takes_over_stale_claims_only(client, catalog_file, flask_app, routes):
+    catalog_file('episode.mp4')
+    stale, fresh, done = create_batch(client, {'items': [{'path': 'episode.mp4'}] * 3})['job_ids']
+    lease = timedelta(seconds=flask_app.config['BATCH_LEASE_SECONDS'])
+
+    set_job(flask_app, stale, status='processing', claimed_at=datetime.utcnow() - lease * 2)
+    set_job(flask_app, fresh, status='processing', claimed_at=datetime.utcnow())
+    set_job(flask_app, done, status='cancelled')
+
+    assert routes.claim_batch_job() == stale
+    assert routes.claim_batch_job() is None
+
+
+def test_batch_status_aggregates_progress(client, catalog_file, flask_app):
+    catalog_file('episode.mp4')
+    result = create_batch(client, {'name': 'catalog', 'items': [{'path': 'episode.mp4'}] * 4})
+    completed, failed, processing, pending = result['job_ids']
+
+    set_job(flask_app, completed, status='completed', progress=100)
+    set_job(flask_app, failed, status='failed', progress=0)
+    set_job(flask_app, processing, status='processing', progress=40)
+
+    status = client.get(f"/api/batch/{result['batch_id']}").get_json()
+    assert status['batch']['name'] == 'catalog'
+    assert status['counts'] == {'completed': 1, 'failed': 1, 'processing': 1, 'pending': 1}
+    assert status['progress'] == 60
+    assert status['finished'] is False
+
+    set_job(flask_app, processing, status='completed', progress=100)
+    set_job(flask_app, pending, status='cancelled')
+
+    status = client.get(f"/api/batch/{result['batch_id']}").get_json()
+    assert status['progress'] == 100
+    assert status['finished'] is True
+
+
+def test_content_hash_items_survive_cancelling_the_source_job(client, flask_app, routes, monkeypatch):
+    from app import db
+    from models import VideoJob
+
+    monkeypatch.setattr(routes, 'process_video', lambda *args: None)
+    upload = client.post('/api/upload', data={'video': (io.BytesIO(b'video'), 'clip.mp4')}).get_json()
+    with flask_app.app_context():
+        content_hash = db.session.get(VideoJob, upload['job_id']).content_hash
+
+    result = create_batch(client, {'items': [{'content_hash': content_hash}]})
+    client.post(f"/api/cancel/{upload['job_id']}")
+
+    with flask_app.app_context():
+        job = db.session.get(VideoJob, result['job_ids'][0])
+        assert job.original_filename == 'clip.mp4'
+        assert job.video_path.startswith(os.path.join(flask_app.config['UPLOAD_FOLDER'], job.id))
+        with open(job.video_path, 'rb') as f:
+            assert f.read() == b'video'
@@ -0,0 +1,127 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import mixer  # noqa: E402
+
+
+def test_k_weighting_matches_itu_coefficients_at_48khz():
+    b, a = mixer._shelf_coefficients(*mixer._SHELF, sample_rate=48000)
+    assert np.allclose(b, [1.53512485958697, -2.69169618940638, 1.19839281085285], atol=1e-8)
+    assert np.allclose(a, [1.0, -1.69065929318241, 0.73248077421585], atol=1e-8)
+
+    b, a = mixer._highpass_coefficients(*mixer._HIGHPASS, sample_rate=48000)
+    assert np.allclose(b, [1.0, -2.0, 1.0])
+    assert np.allclose(a, [1.0, -1.99004745483398, 0.99007225036621], atol=1e-8)
+
+
+def test_997hz_reference_tone_measures_minus_20_lufs():
+    pytest.importorskip('scipy')
+
+    # -20 dBFS 997 Hz sine on both channels reads -20.00 LUFS under BS.1770
+    t = np.arange(mixer.SAMPLE_RATE * 10) / mixer.SAMPLE_RATE
+    tone = (0.1 * np.sin(2 * np.pi * 997 * t)).astype(np.float32)
+    block = np.stack([tone, tone], axis=1)
+
+    loudness, peak = mixer.measure_loudness([block])
+
+    assert loudness == pytest.approx(-20.0, abs=0.02)
+    assert peak == pytest.approx(0.1, abs=1e-3)
+
+
+def test_mix_without_any_audio_raises(tmp_path):
+    dubbed = tmp_path / 'dubbed.pcm'
+    dubbed.write_bytes(b'')
+
+    with open(tmp_path / 'mix.pcm', 'wb') as output, pytest.raises(ValueError):
+        mixer.mix_dubbed_audio(None, str(dubbed), output)
+
+
+def write_pcm(path, samples):
+    """Write float samples in [-1, 1) as raw PCM in the mixer format"""
+    pcm = np.clip(np.round(samples * 32768.0), -32768, 32767).astype(mixer.PCM_DTYPE)
+    path.write_bytes(pcm.tobytes())
+    return str(path)
+
+
+def read_mix(data):
+    return np.frombuffer(data, dtype=mixer.PCM_DTYPE).reshape(-1, mixer.CHANNELS).astype(np.float32) / 32768.0
+
+
+def test_ducking_gain_applies_lookahead_hold_and_ramp():
+    # One second of speech starting at frame 100, silence elsewhere
+    envelope = np.full(400, -np.inf, dtype=np.float32)
+    envelope[100:200] = -20.0
+
+    gain = mixer.ducking_gain(envelope, duck_db=-14.0, lookahead=0.1, hold=0.25, ramp=0.2)
+    ducked = 10.0 ** (-14.0 / 20.0)
+
+    # Gate covers frames 90-224 (10 frames lookahead, 25 hold), ramps are 10 frames each side
+    assert np.allclose(gain[:80], 1.0)
+    assert np.allclose(gain[100:215], ducked)
+    assert np.allclose(gain[235:], 1.0)
+    assert np.all(np.diff(gain[80:101]) <= 0)
+    assert np.all(np.diff(gain[214:236]) >= 0)
+    assert ducked < gain[90] < 1.0
+
+
+def test_mixed_blocks_do_not_depend_on_block_size(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    num_samples = mixer.SAMPLE_RATE * 3 + 1234
+    original = mixer.open_pcm(write_pcm(tmp_path / 'orig.pcm', rng.uniform(-0.3, 0.3, (num_samples, 2))))
+    dubbed = mixer.open_pcm(write_pcm(tmp_path / 'dub.pcm', rng.uniform(-0.3, 0.3, (num_samples // 2, 2))))
+    gain = mixer.ducking_gain(mixer.speech_envelope(dubbed, num_samples))
+
+    whole = np.concatenate(list(mixer._mixed_blocks(original, dubbed, gain, num_samples)))
+
+    monkeypatch.setattr(mixer, 'BLOCK_SIZE', mixer.SUBBLOCK_SIZE * 3)
+    assert np.array_equal(mixer.ducking_gain(mixer.speech_envelope(dubbed, num_samples)), gain)
+    streamed = np.concatenate(list(mixer._mixed_blocks(original, dubbed, gain, num_samples)))
+
+    assert streamed.shape == (num_samples, mixer.CHANNELS)
+    assert np.allclose(streamed, whole, atol=1e-6)
+
+
+def test_mix_is_normalized_to_target_loudness(tmp_path):
+    pytest.importorskip('scipy')
+    import io
+
+    rng = np.random.default_rng(1)
+    num_samples = mixer.SAMPLE_RATE * 20
+    t = np.arange(num_samples) / mixer.SAMPLE_RATE
+    original = np.repeat(rng.normal(0, 0.02, (num_samples, 1)), 2, axis=1)
+    speech = np.where((t % 4) < 2, 0.05 * np.sin(2 * np.pi * 300 * t), 0.0)
+    dubbed = np.stack([speech, speech], axis=1)
+
+    output = io.BytesIO()
+    mixer.mix_dubbed_audio(
+        write_pcm(tmp_path / 'orig.pcm', original),
+        write_pcm(tmp_path / 'dub.pcm', dubbed),
+        output
+    )
+    mix = read_mix(output.getvalue())
+
+    loudness, peak = mixer.measure_loudness([mix])
+    assert len(mix) == num_samples
+    assert loudness == pytest.approx(mixer.TARGET_LUFS, abs=0.1)
+    assert peak <= 10.0 ** (mixer.PEAK_DB / 20.0) + 1e-4
+
+
+def test_mix_gain_is_limited_by_sample_peak(tmp_path):
+    pytest.importorskip('scipy')
+    import io
+
+    # Quiet speech with one loud click: reaching the target would clip the click
+    num_samples = mixer.SAMPLE_RATE * 5
+    t = np.arange(num_samples) / mixer.SAMPLE_RATE
+    speech = 0.01 * np.sin(2 * np.pi * 300 * t)
+    speech[mixer.SAMPLE_RATE] = 0.5
+    dubbed = np.stack([speech, speech], axis=1)
+
+    output = io.BytesIO()
+    mixer.mix_dubbed_audio(None, write_pcm(tmp_path / 'dub.pcm', dubbed), output)
+    mix = read_mix(output.getvalue())
+
+    loudness, peak = mixer.measure_loudness([mix])
+    assert peak == pytest.approx(10.0 ** (mixer.PEAK_DB / 20.0), abs=1e-3)
+    assert loudness < mixer.TARGET_LUFS
@@ -0,0 +1,145 @@
+from datetime import datetime
+
+import pytest
+
+
+@pytest.fixture
+def routes(flask_app):
+    import routes
+    return routes
+
+
+@pytest.fixture
+def job_id(client, flask_app, routes):
+    """A processing job with a transcript, a translation and all its stages"""
+    from app import db
+    from models import VideoJob, ProcessingStage, generate_job_id
+
+    with flask_app.app_context():
+        job = VideoJob(
+            id=generate_job_id(),
+            original_filename='clip.mp4',
+            status='processing',
+            target_language='es',
+            transcript=' '.join(f'Sentence {i}.' for i in range(120)),
+            translation='Hola. Adiós.',
+            text_updated_at=datetime.utcnow()
+        )
+        db.session.add(job)
+        db.session.add_all(
+            ProcessingStage(job_id=job.id, stage_name=stage_name, message=stage_message)
+            for stage_name, stage_message in routes.PROCESSING_STAGES
+        )
+        db.session.commit()
+        return job.id
+
+
+def test_status_round_trips_etag_to_304(client, job_id):
+    response = client.get(f'/api/v2/status/{job_id}')
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+    assert etag.startswith('W/"')
+
+    cached = client.get(f'/api/v2/status/{job_id}', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.headers['ETag'] == etag
+    assert cached.data == b''
+
+
+def test_status_etag_changes_after_job_and_stage_updates(client, flask_app, routes, job_id):
+    first = client.get(f'/api/v2/status/{job_id}').headers['ETag']
+
+    with flask_app.app_context():
+        routes.update_stage_status(job_id, 'extracting', 'processing')
+    second = client.get(f'/api/v2/status/{job_id}', headers={'If-None-Match': first})
+    assert second.status_code == 200
+    assert second.get_json()['stages'][0]['status'] == 'processing'
+
+    with flask_app.app_context():
+        routes.update_job_progress(job_id, 10, 'Extracting audio from video...')
+    third = client.get(f'/api/v2/status/{job_id}', headers={'If-None-Match': second.headers['ETag']})
+    assert third.status_code == 200
+    assert third.get_json()['progress'] == 10
+    assert len({first, second.headers['ETag'], third.headers['ETag']}) == 3
+
+
+def test_status_is_compact(client, job_id):
+    status = client.get(f'/api/v2/status/{job_id}').get_json()
+
+    assert 'transcript' not in status
+    assert 'translation' not in status
+    assert status['version'] == '2'
+    assert [stage['stage_name'] for stage in status['stages']] == [
+        'extracting', 'transcribing', 'translating', 'generating', 'merging'
+    ]
+    assert all('job_id' not in stage and 'id' not in stage for stage in status['stages'])
+
+
+def test_status_field_selection(client, job_id):
+    response = client.get(f'/api/v2/status/{job_id}?fields=status,progress')
+    assert response.get_json() == {'status': 'processing', 'progress': 0, 'version': '2'}
+
+    # Different field selections are different representations
+    full = client.get(f'/api/v2/status/{job_id}')
+    assert full.headers['ETag'] != response.headers['ETag']
+
+    bogus = client.get(f'/api/v2/status/{job_id}?fields=status,bogus')
+    assert bogus.status_code == 400
+    assert 'bogus' in bogus.get_json()['error']
+
+
+def test_status_unknown_job_is_404(client):
+    assert client.get('/api/v2/status/missing').status_code == 404
+
+
+def test_segments_paginate(client, job_id):
+    page = client.get(f'/api/v2/status/{job_id}/transcript?offset=10&limit=5').get_json()
+    assert page['total'] == 120
+    assert page['segments'] == [{'index': i, 'text': f'Sentence {i}.'} for i in range(10, 15)]
+
+    translation = client.get(f'/api/v2/status/{job_id}/translation').get_json()
+    assert [segment['text'] for segment in translation['segments']] == ['Hola.', 'Adiós.']
+
+
+def test_segments_page_bounds(client, routes, job_id):
+    past_end = client.get(f'/api/v2/status/{job_id}/transcript?offset=500').get_json()
+    assert past_end['total'] == 120
+    assert past_end['segments'] == []
+
+    clamped = client.get(f'/api/v2/status/{job_id}/transcript?limit=100000').get_json()
+    assert clamped['limit'] == routes.MAX_SEGMENTS_PER_PAGE
+
+    assert client.get('/api/v2/status/missing/transcript').status_code == 404
+    assert client.get(f'/api/v2/status/{job_id}/transcript?offset=-1').status_code == 400
+    assert client.get(f'/api/v2/status/{job_id}/transcript?limit=0').status_code == 400
+
+
+@pytest.mark.parametrize('query', ['offset=abc', 'limit=x', 'offset=1.5'])
+def test_segments_reject_non_integer_paging(client, job_id, query):
+    response = client.get(f'/api/v2/status/{job_id}/transcript?{query}')
+    assert response.status_code == 400
+    assert 'integers' in response.get_json()['error']
+
+
+def test_segment_etag_tracks_text_not_progress(client, flask_app, routes, job_id):
+    from app import db
+    from models import VideoJob
+
+    url = f'/api/v2/status/{job_id}/transcript?limit=5'
+    etag = client.get(url).headers['ETag']
+
+    with flask_app.app_context():
+        routes.update_stage_status(job_id, 'generating', 'processing')
+        routes.update_job_progress(job_id, 60, 'Generating speech from translation...')
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+    with flask_app.app_context():
+        job = db.session.get(VideoJob, job_id)
+        job.transcript = 'Rewritten. Transcript.'
+        job.text_updated_at = datetime.utcnow()
+        db.session.commit()
+
+    changed = client.get(url, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()['total'] == 2
@@ -1,4 +1,7 @@
 import os
+import re
+import shutil
+import hashlib
 import subprocess
 import tempfile
 import logging
@@ -168,9 +171,15 @@ def split_into_chunks(text, max_chars=5000):
     
     return chunks
 
+def split_into_segments(text):
+    """Split text into sentence segments for paginated transcript and translation reads"""
+    if not text:
+        return []
+    return [segment for segment in re.split(r'(?<=[.!?])\s+|(?<=[。！？])', text) if segment.strip()]
+
 def merge_audio_video(video_path, audio_path, output_path):
     """
-    Merge audio with video using ffmpeg directly
+    Merge audio with video, ducking the original audio under the dubbed speech
     
     Args:
         video_path: Path to the original video
@@ -181,70 +190,94 @@ def merge_audio_video(video_path, audio_path, output_path):
         True if successful, False otherwise
     """
     try:
-        # Extract original audio at reduced volume for background ambience
-        temp_orig_audio = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-        temp_orig_audio_path = temp_orig_audio.name
-        temp_orig_audio.close()
-        
-        # Create mixed audio file
-        temp_mixed_audio = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-        temp_mixed_audio_path = temp_mixed_audio.name
-        temp_mixed_audio.close()
+        # Imported here so the rest of the app does not require NumPy
+        from mixer import PCM_INPUT_ARGS, decode_to_pcm, mix_dubbed_audio
         
-        # Extract original audio
-        ffmpeg_extract_cmd = [
-            'ffmpeg', '-i', video_path, 
-            '-vn', '-acodec', 'pcm_s16le', '-ar', '44100',
-            '-filter:a', 'volume=0.1', # Lower volume to 10%
-            temp_orig_audio_path
-        ]
-        
-        # Run the command
-        process = subprocess.run(ffmpeg_extract_cmd, 
-                               capture_output=True, 
-                               check=False)
-        
-        # If original has audio, mix it with the dubbed audio
-        if process.returncode == 0:
-            # Mix the two audio streams
-            ffmpeg_mix_cmd = [
-                'ffmpeg', 
-                '-i', audio_path,
-                '-i', temp_orig_audio_path,
-                '-filter_complex', '[0:a][1:a]amix=inputs=2:duration=longest',
-                temp_mixed_audio_path
+        with tempfile.TemporaryDirectory() as temp_dir:
+            orig_pcm_path = os.path.join(temp_dir, 'original.pcm')
+            dubbed_pcm_path = os.path.join(temp_dir, 'dubbed.pcm')
+            
+            # Decode the dubbed speech and, if present, the original audio
+            if not decode_to_pcm(audio_path, dubbed_pcm_path):
+                raise Exception("Failed to decode dubbed audio")
+            if not decode_to_pcm(video_path, orig_pcm_path):
+                # If original has no audio or extraction failed, just use the dubbed audio
+                orig_pcm_path = None
+            
+            # Stream the mix straight into the muxer instead of encoding an intermediate file
+            ffmpeg_merge_cmd = [
+                'ffmpeg', '-y', '-loglevel', 'error',
+                '-i', video_path,
+            ] + PCM_INPUT_ARGS + [
+                '-i', 'pipe:0',
+                '-c:v', 'copy',
+                '-c:a', 'aac',
+                '-map', '0:v',
+                '-map', '1:a',
+                '-shortest',
+                output_path
             ]
-            subprocess.run(ffmpeg_mix_cmd, check=True, capture_output=True)
-            audio_to_use = temp_mixed_audio_path
-        else:
-            # If original has no audio or extraction failed, just use the dubbed audio
-            audio_to_use = audio_path
-        
-        # Merge video with the new audio
-        ffmpeg_merge_cmd = [
-            'ffmpeg',
-            '-i', video_path,
-            '-i', audio_to_use,
-            '-c:v', 'copy',
-            '-c:a', 'aac',
-            '-map', '0:v',
-            '-map', '1:a',
-            '-shortest',
-            output_path
-        ]
-        subprocess.run(ffmpeg_merge_cmd, check=True, capture_output=True)
-        
-        # Clean up temporary files
-        if os.path.exists(temp_orig_audio_path):
-            os.unlink(temp_orig_audio_path)
-        if os.path.exists(temp_mixed_audio_path):
-            os.unlink(temp_mixed_audio_path)
+            # Send stderr to a file so a chatty ffmpeg can't block while we write its stdin
+            stderr_path = os.path.join(temp_dir, 'ffmpeg.log')
+            with open(stderr_path, 'wb') as stderr_file:
+                process = subprocess.Popen(ffmpeg_merge_cmd,
+                                           stdin=subprocess.PIPE,
+                                           stdout=subprocess.DEVNULL,
+                                           stderr=stderr_file)
+            try:
+                mix_dubbed_audio(orig_pcm_path, dubbed_pcm_path, process.stdin)
+            except BrokenPipeError:
+                # ffmpeg stops reading once -shortest has reached the end of the video
+                pass
+            finally:
+                try:
+                    process.stdin.close()
+                except BrokenPipeError:
+                    pass
+                process.wait()
+            
+            if process.returncode != 0:
+                with open(stderr_path, 'rb') as stderr_file:
+                    stderr = stderr_file.read().decode('utf-8', errors='replace').strip()
+                raise Exception(f"ffmpeg exited with status {process.returncode}: {stderr}")
         
         return True
     except Exception as e:
         logging.error(f"Error merging audio with video: {str(e)}")
         return False
 
+def save_with_sha256(stream, file_path, chunk_size=1024 * 1024):
+    """
+    Save a stream to disk, hashing it on the way so the file is never re-read
+    
+    Args:
+        stream: Binary file-like object to read from
+        file_path: Path to save the file to
+        chunk_size: Number of bytes to read at a time
+        
+    Returns:
+        Hex SHA-256 digest of the saved contents
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'wb') as f:
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            digest.update(chunk)
+            f.write(chunk)
+    return digest.hexdigest()
+
+def link_or_copy(source_path, dest_path):
+    """
+    Hard-link a file to a new path, copying it when linking is not possible
+    
+    Args:
+        source_path: Existing file
+        dest_path: Path for the new link or copy
+    """
+    try:
+        os.link(source_path, dest_path)
+    except OSError:
+        shutil.copyfile(source_path, dest_path)
+
 def clean_temp_files(job_id):
     """
     Clean up temporary files for a job